@@ -12,21 +12,25 @@ A API estará disponível em: http://localhost:8000
 Documentação: http://localhost:8000/docs
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
-import joblib
-import numpy as np
-import json
 from pathlib import Path
+import os
 import uvicorn
 
+from drift_monitor import DriftMonitor
+from genre_classifier import ExplanationUnavailable, GenreClassifier
+from static_responses import build_static_response, serve_static_response
+
 # ============================================
 # Configuração
 # ============================================
 BASE_DIR = Path(__file__).resolve().parent
 MODEL_DIR = BASE_DIR / 'saved_models'
+# Agrupa predições concorrentes em lotes (0 = desativado)
+MAX_BATCH_SIZE = int(os.environ.get('ML_API_MAX_BATCH_SIZE', '0'))
 
 app = FastAPI(
     title="Music Genre Classifier API",
@@ -49,27 +53,34 @@ app.add_middleware(
 print("🚀 Iniciando servidor da API...")
 print(f"📂 Diretório de modelos: {MODEL_DIR}")
 
+classifier = GenreClassifier(MODEL_DIR, max_batch_size=MAX_BATCH_SIZE)
+
+# Monitor de drift das entradas de /classify e /classify_profile
+drift_monitor = None
+
+
+def rebuild_drift_monitor(classifier: GenreClassifier):
+    """Recria o monitor de drift com a referência do modelo carregado"""
+    global drift_monitor
+    previous = drift_monitor
+    drift_monitor = DriftMonitor(classifier.metadata['features'])
+    if previous is not None:
+        previous.close()
+
+
+classifier.add_load_listener(rebuild_drift_monitor)
+
 try:
-    # Carregar pipeline
-    model_path = MODEL_DIR / 'genre_classifier_pipeline.joblib'
-    pipeline = joblib.load(model_path)
-    print(f"✓ Pipeline carregado: {model_path.name}")
+    classifier.load()
+    print("✓ Pipeline, encoder e metadata carregados")
     
-    # Carregar encoder
-    encoder_path = MODEL_DIR / 'genre_encoder.joblib'
-    genre_encoder = joblib.load(encoder_path)
-    print(f"✓ Encoder carregado: {encoder_path.name}")
-    
-    # Carregar metadata
-    metadata_path = MODEL_DIR / 'model_metadata.json'
-    with open(metadata_path, 'r', encoding='utf-8') as f:
-        metadata = json.load(f)
-    print(f"✓ Metadata carregado: {metadata_path.name}")
+    if classifier.can_explain:
+        print("✓ Contribuições carregadas (/explain disponível)")
     
     print("\n✅ Modelo carregado com sucesso!")
-    print(f"🎯 Tipo: {metadata['model_info']['type']}")
-    print(f"📊 Acurácia: {metadata['model_info']['test_accuracy']:.2%}")
-    print(f"🎵 Gêneros: {', '.join(metadata['genres']['classes'])}")
+    print(f"🎯 Tipo: {classifier.metadata['model_info']['type']}")
+    print(f"📊 Acurácia: {classifier.metadata['model_info']['test_accuracy']:.2%}")
+    print(f"🎵 Gêneros: {', '.join(classifier.metadata['genres']['classes'])}")
     
 except Exception as e:
     print(f"\n❌ ERRO ao carregar modelo: {e}")
@@ -126,11 +137,19 @@ class GenreScore(BaseModel):
     confidence: float
 
 
+class ValidationReport(BaseModel):
+    """Comparação da entrada com a distribuição de treino"""
+    out_of_distribution: bool
+    max_abs_zscore: float
+    out_of_range_features: List[str]
+
+
 class ClassificationResult(BaseModel):
     """Resultado da classificação"""
     primary_genre: str
     confidence: float
     all_scores: List[GenreScore]
+    validation: Optional[ValidationReport] = None
 
 
 class UserProfile(BaseModel):
@@ -153,136 +172,167 @@ class UserProfile(BaseModel):
     subgenre_encoded: Optional[int] = 0
 
 
+class ExplainRequest(BaseModel):
+    """Lote de músicas e/ou perfis a explicar"""
+    tracks: List[MusicFeatures] = []
+    profiles: List[UserProfile] = []
+
+
+class GenreExplanation(BaseModel):
+    """Contribuições das features para a probabilidade de um gênero"""
+    genre: str
+    probability: float
+    base_value: float
+    contributions: Dict[str, float]
+
+
+class Explanation(BaseModel):
+    """Explicação da predição de uma música ou perfil"""
+    primary_genre: str
+    genres: List[GenreExplanation]
+    validation: Optional[ValidationReport] = None
+
+
+class ExplainResponse(BaseModel):
+    """Explicações na ordem: músicas e depois perfis"""
+    explanations: List[Explanation]
+
+
+# ============================================
+# Respostas Estáticas (pré-computadas)
+# ============================================
+def refresh_static_responses(classifier: GenreClassifier):
+    """Reconstrói as respostas de /, /info e /genres a partir do metadata"""
+    global static_responses
+    metadata = classifier.metadata
+    static_responses = {
+        'root': build_static_response({
+            "message": "Music Genre Classifier API",
+            "version": "2.0.0",
+            "status": "online",
+            "docs": "/docs",
+            "endpoints": {
+                "info": "/info",
+                "classify": "/classify",
+                "classify_profile": "/classify_profile",
+                "explain": "/explain",
+                "drift": "/metrics/drift"
+            }
+        }),
+        'info': build_static_response({
+            "model": metadata['model_info'],
+            "features": {
+                "count": len(metadata['features']['list']),
+                "list": metadata['features']['list']
+            },
+            "genres": metadata['genres']['classes'],
+            "n_genres": metadata['genres']['n_classes']
+        }),
+        'genres': build_static_response({
+            "genres": metadata['genres']['classes'],
+            "profiles": metadata['genres']['profiles']
+        }),
+    }
+
+
+# Chamada agora e a cada recarga do modelo
+classifier.add_load_listener(refresh_static_responses)
+
+
 # ============================================
 # Endpoints
 # ============================================
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Informações básicas da API"""
-    return {
-        "message": "Music Genre Classifier API",
-        "version": "2.0.0",
-        "status": "online",
-        "docs": "/docs",
-        "endpoints": {
-            "info": "/info",
-            "classify": "/classify",
-            "classify_profile": "/classify_profile"
-        }
-    }
+    return serve_static_response(static_responses['root'], request)
 
 
 @app.get("/info")
-async def get_model_info():
+async def get_model_info(request: Request):
     """Retorna informações sobre o modelo"""
-    return {
-        "model": metadata['model_info'],
-        "features": {
-            "count": len(metadata['features']['list']),
-            "list": metadata['features']['list']
-        },
-        "genres": metadata['genres']['classes'],
-        "n_genres": metadata['genres']['n_classes']
-    }
+    return serve_static_response(static_responses['info'], request)
 
 
 @app.get("/genres")
-async def get_genres():
+async def get_genres(request: Request):
     """Retorna a lista de gêneros disponíveis"""
-    return {
-        "genres": metadata['genres']['classes'],
-        "profiles": metadata['genres']['profiles']
-    }
+    return serve_static_response(static_responses['genres'], request)
 
 
+# Endpoints de predição são síncronos: rodam no threadpool do FastAPI,
+# o que permite ao GenreClassifier agrupar requisições concorrentes.
 @app.post("/classify", response_model=ClassificationResult)
-async def classify_track(features: MusicFeatures):
+def classify_track(features: MusicFeatures):
     """
     Classifica uma música individual com base em suas features.
     
     Retorna o gênero previsto com probabilidades para todos os gêneros.
     """
+    record = features.dict()
     try:
-        # Converter para array na ordem correta das features
-        feature_order = metadata['features']['list']
-        feature_dict = features.dict()
-        
-        X = np.array([[feature_dict[f] for f in feature_order]])
-        
-        # Fazer predição
-        y_pred = pipeline.predict(X)[0]
-        y_proba = pipeline.predict_proba(X)[0]
-        
-        # Decodificar gênero
-        primary_genre = genre_encoder.inverse_transform([y_pred])[0]
-        confidence = float(y_proba[y_pred])
-        
-        # Criar scores para todos os gêneros
-        all_scores = []
-        for idx, genre in enumerate(genre_encoder.classes_):
-            all_scores.append(GenreScore(
-                genre=genre,
-                probability=float(y_proba[idx]),
-                confidence=float(y_proba[idx]) * 100
-            ))
-        
-        # Ordenar por probabilidade
-        all_scores.sort(key=lambda x: x.probability, reverse=True)
-        
-        return ClassificationResult(
-            primary_genre=primary_genre,
-            confidence=confidence,
-            all_scores=all_scores
-        )
-        
+        result = classifier.classify([record])[0]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na classificação: {str(e)}")
+    
+    drift_monitor.record(record)
+    return ClassificationResult(**result)
 
 
 @app.post("/classify_profile", response_model=ClassificationResult)
-async def classify_user_profile(profile: UserProfile):
+def classify_user_profile(profile: UserProfile):
     """
     Classifica o perfil musical de um usuário com base nas médias de suas features.
     
     Este endpoint recebe features agregadas (médias) das músicas que o usuário gosta
     e retorna os gêneros que melhor correspondem ao seu gosto musical.
     """
+    record = profile.dict()
     try:
-        # Converter para features completas
-        feature_dict = profile.dict()
-        feature_order = metadata['features']['list']
-        
-        # Garantir que todas as features estão presentes
-        X = np.array([[feature_dict.get(f, 0) for f in feature_order]])
-        
-        # Fazer predição
-        y_pred = pipeline.predict(X)[0]
-        y_proba = pipeline.predict_proba(X)[0]
-        
-        # Decodificar gênero
-        primary_genre = genre_encoder.inverse_transform([y_pred])[0]
-        confidence = float(y_proba[y_pred])
-        
-        # Criar scores para todos os gêneros
-        all_scores = []
-        for idx, genre in enumerate(genre_encoder.classes_):
-            all_scores.append(GenreScore(
-                genre=genre,
-                probability=float(y_proba[idx]),
-                confidence=float(y_proba[idx]) * 100
-            ))
-        
-        # Ordenar por probabilidade
-        all_scores.sort(key=lambda x: x.probability, reverse=True)
-        
-        return ClassificationResult(
-            primary_genre=primary_genre,
-            confidence=confidence,
-            all_scores=all_scores
-        )
-        
+        result = classifier.classify([record])[0]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na classificação do perfil: {str(e)}")
+    
+    drift_monitor.record(record)
+    return ClassificationResult(**result)
+
+
+@app.post("/explain", response_model=ExplainResponse)
+def explain(request: ExplainRequest):
+    """
+    Explica por que cada música/perfil foi classificado em cada gênero.
+    
+    Retorna, para cada gênero, a contribuição de cada feature para a
+    probabilidade prevista (probabilidade = base_value + soma das contribuições).
+    Calculado a partir das contribuições por nó salvas na exportação, com
+    custo equivalente ao de uma predição.
+    """
+    records = [item.dict() for item in list(request.tracks) + list(request.profiles)]
+    try:
+        explanations = classifier.explain(records)
+    except ExplanationUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na explicação: {str(e)}")
+    
+    return ExplainResponse(explanations=[Explanation(**e) for e in explanations])
+
+
+@app.get("/metrics/drift")
+async def get_drift_metrics():
+    """
+    Divergência entre as entradas recentes e a distribuição de treino.
+    
+    Retorna PSI e Jensen-Shannon por feature na janela deslizante atual
+    e a lista de features com PSI acima do limite.
+    """
+    return drift_monitor.report()
 
 
 @app.get("/health")
@@ -290,11 +340,18 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "model_loaded": pipeline is not None,
-        "encoder_loaded": genre_encoder is not None
+        "model_loaded": classifier.is_loaded,
+        "encoder_loaded": classifier.is_loaded
     }
 
 
+@app.on_event("shutdown")
+def shutdown():
+    """Libera o classificador e o monitor de drift ao encerrar o servidor"""
+    drift_monitor.close()
+    classifier.close()
+
+
 # ============================================
 # Main
 # ============================================
@@ -0,0 +1,134 @@
+# ============================================
+# Benchmark: GenreClassifier em processo vs API HTTP
+# ============================================
+"""
+Compara o throughput de classificação chamando o GenreClassifier no
+próprio processo com o mesmo trabalho feito via HTTP (/classify_profile).
+
+Uso:
+    python api_model_server.py          # em outro terminal
+    python benchmark_inprocess.py
+    python benchmark_inprocess.py --requests 2000 --threads 8 --max-batch-size 64
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+import requests
+
+from genre_classifier import GenreClassifier, MODEL_DIR
+
+API_BASE_URL = "http://localhost:8000"
+
+# Campos inteiros no UserProfile da API
+INTEGER_FEATURES = {'release_year', 'subgenre_encoded'}
+
+
+def build_records(classifier: GenreClassifier, n: int, seed: int = 42) -> List[Dict]:
+    """Gera perfis variando levemente os perfis médios de cada gênero"""
+    rng = np.random.default_rng(seed)
+    profiles = list(classifier.metadata['genres']['profiles'].values())
+    stats = classifier.metadata['features']['stats']
+    records = []
+    for i in range(n):
+        base = profiles[i % len(profiles)]
+        record = {
+            feature: float(value + rng.normal(0, 0.1) * stats[feature]['std'])
+            for feature, value in base.items()
+        }
+        for feature in INTEGER_FEATURES & record.keys():
+            record[feature] = int(round(record[feature]))
+        records.append(record)
+    return records
+
+
+def run(label: str, call: Callable[[Dict], object], records: List[Dict], threads: int) -> Dict:
+    """Executa uma chamada por registro e mede latência e throughput"""
+    def timed(record):
+        t0 = time.perf_counter()
+        call(record)
+        return time.perf_counter() - t0
+
+    # Aquecimento
+    for record in records[:10]:
+        call(record)
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            latencies = list(executor.map(timed, records))
+    else:
+        latencies = [timed(record) for record in records]
+    total = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'label': label,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'throughput': len(records) / total,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark em processo vs HTTP")
+    parser.add_argument('--url', default=API_BASE_URL)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--max-batch-size', type=int, default=0,
+                        help="Ativa o agrupamento em lotes do GenreClassifier")
+    args = parser.parse_args(argv)
+
+    print("📂 Carregando GenreClassifier em processo...")
+    classifier = GenreClassifier(MODEL_DIR, max_batch_size=args.max_batch_size).load()
+    records = build_records(classifier, args.requests)
+    print(f"✓ {len(records)} registros, {args.threads} thread(s)")
+
+    results = [
+        run("Em processo (1 registro)", lambda r: classifier.classify([r]), records, args.threads),
+    ]
+
+    # Um único lote com todos os registros
+    start = time.perf_counter()
+    classifier.classify(records)
+    total = time.perf_counter() - start
+    results.append({
+        'label': "Em processo (lote único)",
+        'p50_ms': total * 1000,
+        'p99_ms': total * 1000,
+        'throughput': len(records) / total,
+    })
+
+    session = requests.Session()
+
+    def http_call(record):
+        response = session.post(f"{args.url}/classify_profile", json=record, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        results.append(run("HTTP /classify_profile", http_call, records, args.threads))
+    except requests.exceptions.ConnectionError as e:
+        print(f"\n⚠️  API HTTP indisponível ({e}), comparando apenas em processo")
+        print("   Inicie a API com: python api_model_server.py")
+
+    classifier.close()
+
+    print(f"\n{'Caminho':28} {'p50 (ms)':>10} {'p99 (ms)':>10} {'req/s':>10}")
+    print("-" * 61)
+    for result in results:
+        print(f"{result['label']:28} {result['p50_ms']:>10.3f} "
+              f"{result['p99_ms']:>10.3f} {result['throughput']:>10.1f}")
+
+    if len(results) == 3:
+        speedup = results[0]['throughput'] / results[2]['throughput']
+        print(f"\n🚀 Em processo é {speedup:.1f}x mais rápido que HTTP (1 registro por chamada)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
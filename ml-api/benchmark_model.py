@@ -0,0 +1,595 @@
+# ============================================
+# Benchmark de Regressão de Performance do Modelo
+# ============================================
+"""
+Compara o artefato candidato (recém-exportado) com o artefato atual
+em saved_models/ e só promove o candidato se ele não regredir em
+performance além dos limites configurados.
+
+Métricas comparadas (por tamanho de batch):
+    - tempo de carregamento dos arquivos do artefato
+    - memória (RSS) adicionada pela carga do artefato
+    - latência p50/p99 por batch
+    - throughput (linhas/s)
+
+As medições rodam em subprocessos novos (python benchmark_model.py
+--measure-load/--measure-latency). Na medição de carga, sklearn/imblearn
+já estão importados antes do cronômetro e da leitura inicial de RSS, então
+só o custo do artefato é comparado. A latência dos dois artefatos é medida
+no mesmo processo, intercalando batches; o processo se repete por várias
+rodadas, e a comparação usa as medianas. Diferenças menores que o ruído
+(a variação observada entre as rodadas, ou um piso absoluto limitado a
+uma fração do valor atual) são ignoradas.
+
+Uso:
+    python benchmark_model.py
+    python benchmark_model.py --candidate saved_models/candidate --max-p99-regression 0.3
+    python benchmark_model.py --force   # promove mesmo com regressão
+
+Sai com código != 0 (e mantém os arquivos atuais) se houver regressão.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+
+try:
+    import resource  # Indisponível no Windows
+except ImportError:
+    resource = None
+
+# ============================================
+# Configuração
+# ============================================
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR.parent.parent / 'PISI3-Projeto' / 'DataSet'
+MODEL_DIR = BASE_DIR / 'saved_models'
+CANDIDATE_DIR = MODEL_DIR / 'candidate'
+
+# Arquivos que compõem um artefato (promovidos juntos)
+ARTIFACT_FILES = [
+    'genre_classifier_pipeline.joblib',
+    'genre_encoder.joblib',
+    'subgenre_encoder.joblib',
+    'model_metadata.json',
+]
+
+# Arquivos opcionais (ausentes em artefatos antigos)
+OPTIONAL_ARTIFACT_FILES = [
+    'tree_contributions.joblib',
+]
+
+DEFAULT_BATCH_SIZES = [1, 8, 64, 512]
+DEFAULT_SAMPLE_SIZE = 2000
+DEFAULT_REPEATS = 3
+DEFAULT_TRIALS = 3
+SAMPLE_SEED = 42
+
+# Módulos importados antes de medir a carga (o custo do import não é do artefato)
+PRELOAD_MODULES = [
+    'imblearn.pipeline',
+    'imblearn.over_sampling',
+    'sklearn.preprocessing',
+    'sklearn.ensemble',
+    'sklearn.neighbors',
+    'sklearn.linear_model',
+    'scipy.sparse',
+]
+
+# Regressão máxima tolerada (fração relativa ao artefato atual)
+DEFAULT_THRESHOLDS = {
+    'load_time_s': 0.25,
+    'load_rss_mb': 0.20,
+    'p50_ms': 0.10,
+    'p99_ms': 0.20,
+    'throughput_rows_s': 0.10,
+}
+
+# Diferença absoluta abaixo da qual a variação é tratada como ruído
+# (throughput: diferença no tempo médio por batch, em ms)
+DEFAULT_NOISE_FLOORS = {
+    'load_time_s': 0.05,
+    'load_rss_mb': 10.0,
+    'p50_ms': 1.0,
+    'p99_ms': 2.0,
+    'throughput_rows_s': 1.0,
+}
+# O piso nunca passa desta fração do valor atual (modelos rápidos/pequenos)
+NOISE_FLOOR_MAX_FRACTION = 0.5
+
+
+# ============================================
+# Amostra de benchmark
+# ============================================
+def load_benchmark_sample(csv_path: Path, feature_order: List[str],
+                          n_rows: int = DEFAULT_SAMPLE_SIZE,
+                          seed: int = SAMPLE_SEED) -> np.ndarray:
+    """Carrega uma amostra fixa de linhas do dataset de treino"""
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder
+
+    df = pd.read_csv(csv_path)
+
+    # Mesma engenharia de features do train_and_export_model.py
+    df['release_year'] = pd.to_datetime(df['track_album_release_date'], errors='coerce').dt.year.fillna(0).astype(int)
+    df['subgenre_encoded'] = LabelEncoder().fit_transform(df['playlist_subgenre'])
+
+    return sample_rows(df[feature_order], n_rows, seed)
+
+
+def sample_rows(X, n_rows: int = DEFAULT_SAMPLE_SIZE, seed: int = SAMPLE_SEED) -> np.ndarray:
+    """Amostra determinística de linhas de um DataFrame de features"""
+    n_rows = min(n_rows, len(X))
+    return X.sample(n=n_rows, random_state=seed).to_numpy(dtype=float)
+
+
+def read_feature_order(artifact_dir: Path) -> List[str]:
+    """Lê a ordem das features do metadata de um artefato"""
+    with open(artifact_dir / 'model_metadata.json', 'r', encoding='utf-8') as f:
+        return json.load(f)['features']['list']
+
+
+# ============================================
+# Medição
+# ============================================
+def _peak_rss_mb() -> Optional[float]:
+    """Pico de RSS do processo atual em MB (None se indisponível)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _load_artifact(artifact_dir: Path):
+    """Carrega os arquivos do artefato como o servidor faz; retorna (pipeline, segundos)"""
+    start = time.perf_counter()
+    pipeline = joblib.load(artifact_dir / 'genre_classifier_pipeline.joblib')
+    joblib.load(artifact_dir / 'genre_encoder.joblib')
+    with open(artifact_dir / 'model_metadata.json', 'r', encoding='utf-8') as f:
+        json.load(f)
+    # Contribuições ficam em memória no servidor: entram no tempo e no RSS
+    contributions_path = artifact_dir / 'tree_contributions.joblib'
+    if contributions_path.exists():
+        joblib.load(contributions_path)
+    return pipeline, time.perf_counter() - start
+
+
+def _measure_load(artifact_dir: str) -> Dict:
+    """
+    Tempo de carga e RSS adicionado por um artefato (roda em processo isolado).
+
+    Os imports pesados acontecem antes, então os valores medem só o artefato.
+    """
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    baseline_rss = _peak_rss_mb()
+
+    _, load_time = _load_artifact(Path(artifact_dir))
+    peak_rss = _peak_rss_mb()
+    return {
+        'load_time_s': load_time,
+        'load_rss_mb': max(peak_rss - baseline_rss, 0.0) if peak_rss is not None else None,
+        'baseline_rss_mb': baseline_rss,
+    }
+
+
+def _measure_latency(artifact_dirs: List[str], X: np.ndarray,
+                     batch_sizes: List[int], repeats: int) -> List[Dict]:
+    """
+    Latência e throughput de um ou mais artefatos no mesmo processo.
+
+    Os artefatos se alternam a cada batch (ABBA...), então variações de
+    carga da máquina afetam todos igualmente.
+    """
+    pipelines = [_load_artifact(Path(d))[0] for d in artifact_dirs]
+
+    # Aquecimento
+    for pipeline in pipelines:
+        pipeline.predict_proba(X[:1])
+
+    results = [{} for _ in pipelines]
+    for batch_size in batch_sizes:
+        latencies = [[] for _ in pipelines]
+        n_batch = 0
+        for _ in range(repeats):
+            for i in range(0, len(X), batch_size):
+                batch = X[i:i + batch_size]
+                order = range(len(pipelines))
+                if n_batch % 2:
+                    order = reversed(order)
+                n_batch += 1
+                for idx in order:
+                    t0 = time.perf_counter()
+                    pipelines[idx].predict_proba(batch)
+                    latencies[idx].append(time.perf_counter() - t0)
+
+        for idx, values in enumerate(latencies):
+            total_time = sum(values)
+            latencies_ms = np.array(values) * 1000
+            results[idx][batch_size] = {
+                'p50_ms': float(np.percentile(latencies_ms, 50)),
+                'p99_ms': float(np.percentile(latencies_ms, 99)),
+                'throughput_rows_s': len(X) * repeats / total_time if total_time > 0 else float('inf'),
+            }
+    return results
+
+
+def _run_child(args: List[str]):
+    """
+    Executa este script em um subprocesso e lê o JSON impresso.
+
+    Um subprocesso comum (e não um worker de multiprocessing) não reimporta o
+    script chamador e permite ao sklearn usar n_jobs=-1 como no servidor.
+    """
+    command = [sys.executable, str(Path(__file__).resolve()), *args]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha na medição ({' '.join(args)}):\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_load(artifact_dir: Path) -> Dict:
+    """Mede carga e memória de um artefato em um subprocesso novo"""
+    return _run_child(['--measure-load', str(artifact_dir)])
+
+
+def measure_latency(artifact_dirs: List[Path], sample_path: Path,
+                    batch_sizes: List[int] = DEFAULT_BATCH_SIZES,
+                    repeats: int = DEFAULT_REPEATS) -> List[Dict]:
+    """Mede a latência dos artefatos, intercalados, em um subprocesso novo"""
+    results = _run_child([
+        '--measure-latency', *map(str, artifact_dirs),
+        '--sample-file', str(sample_path),
+        '--repeats', str(repeats),
+        '--batch-sizes', *map(str, batch_sizes),
+    ])
+    # JSON converte as chaves dos batches em string
+    return [{int(k): v for k, v in batches.items()} for batches in results]
+
+
+def median_report(reports: List[Dict]) -> Dict:
+    """Mediana de cada métrica ao longo das rodadas"""
+    def median(values):
+        values = [v for v in values if v is not None]
+        return float(np.median(values)) if values else None
+
+    return {
+        'load_time_s': median([r['load_time_s'] for r in reports]),
+        'load_rss_mb': median([r['load_rss_mb'] for r in reports]),
+        'batches': {
+            batch_size: {
+                metric: median([r['batches'][batch_size][metric] for r in reports])
+                for metric in ('p50_ms', 'p99_ms', 'throughput_rows_s')
+            }
+            for batch_size in reports[0]['batches']
+        },
+    }
+
+
+def spread_report(reports: List[Dict]) -> Dict:
+    """
+    Variação (máximo - mínimo) de cada métrica ao longo das rodadas.
+
+    Throughput é convertido em tempo médio por batch (ms), a mesma unidade
+    da diferença absoluta usada em compare_reports.
+    """
+    def spread(values):
+        values = [v for v in values if v is not None]
+        return float(max(values) - min(values)) if values else 0.0
+
+    def batch_ms(batch_size, throughput):
+        return batch_size * 1000 / throughput if throughput else None
+
+    return {
+        'load_time_s': spread([r['load_time_s'] for r in reports]),
+        'load_rss_mb': spread([r['load_rss_mb'] for r in reports]),
+        'batches': {
+            batch_size: {
+                'p50_ms': spread([r['batches'][batch_size]['p50_ms'] for r in reports]),
+                'p99_ms': spread([r['batches'][batch_size]['p99_ms'] for r in reports]),
+                'throughput_rows_s': spread([
+                    batch_ms(batch_size, r['batches'][batch_size]['throughput_rows_s'])
+                    for r in reports
+                ]),
+            }
+            for batch_size in reports[0]['batches']
+        },
+    }
+
+
+# ============================================
+# Comparação
+# ============================================
+def compare_reports(current: Dict, candidate: Dict,
+                    thresholds: Dict[str, float] = DEFAULT_THRESHOLDS,
+                    noise_floors: Dict[str, float] = DEFAULT_NOISE_FLOORS,
+                    spreads: Optional[List[Dict]] = None) -> List[str]:
+    """
+    Retorna a lista de regressões do candidato em relação ao atual.
+
+    Uma regressão precisa passar do limite relativo e do ruído: o maior
+    entre a variação entre rodadas (spreads, de spread_report) e o piso
+    absoluto, este limitado a NOISE_FLOOR_MAX_FRACTION do valor atual.
+    """
+    regressions = []
+    spreads = spreads or []
+
+    def check(label: str, metric: str, old: Optional[float], new: Optional[float],
+              higher_is_better: bool = False, batch_size: Optional[int] = None):
+        if old is None or new is None or old <= 0 or new <= 0:
+            return
+        if higher_is_better:
+            change = (old - new) / old
+            # Throughput convertido em tempo médio por batch (ms)
+            old_value = batch_size * 1000 / old
+            absolute = batch_size * 1000 / new - old_value
+        else:
+            change = (new - old) / old
+            old_value = old
+            absolute = new - old
+
+        observed = [
+            (s['batches'].get(batch_size, {}) if batch_size is not None else s).get(metric) or 0.0
+            for s in spreads
+        ]
+        noise = max([min(noise_floors[metric], NOISE_FLOOR_MAX_FRACTION * old_value), *observed])
+        if change > thresholds[metric] and absolute > noise:
+            regressions.append(
+                f"{label}: {old:.4g} → {new:.4g} "
+                f"({change:+.1%}, limite {thresholds[metric]:.0%})"
+            )
+
+    check('load_time_s', 'load_time_s', current['load_time_s'], candidate['load_time_s'])
+    check('load_rss_mb', 'load_rss_mb', current['load_rss_mb'], candidate['load_rss_mb'])
+
+    for batch_size, old in current['batches'].items():
+        new = candidate['batches'].get(batch_size)
+        if new is None:
+            continue
+        check(f"batch={batch_size} p50_ms", 'p50_ms', old['p50_ms'], new['p50_ms'],
+              batch_size=batch_size)
+        check(f"batch={batch_size} p99_ms", 'p99_ms', old['p99_ms'], new['p99_ms'],
+              batch_size=batch_size)
+        check(f"batch={batch_size} throughput_rows_s", 'throughput_rows_s',
+              old['throughput_rows_s'], new['throughput_rows_s'],
+              higher_is_better=True, batch_size=batch_size)
+
+    return regressions
+
+
+def print_report(current: Optional[Dict], candidate: Dict):
+    """Imprime a tabela comparativa"""
+    def fmt(value):
+        return f"{value:.4g}" if value is not None else "n/d"
+
+    print(f"\n{'Métrica':32} {'Atual':>12} {'Candidato':>12}")
+    print("-" * 58)
+    for metric in ('load_time_s', 'load_rss_mb'):
+        old = current[metric] if current else None
+        print(f"{metric:32} {fmt(old):>12} {fmt(candidate[metric]):>12}")
+    for batch_size, new in candidate['batches'].items():
+        old = current['batches'].get(batch_size) if current else None
+        for metric in ('p50_ms', 'p99_ms', 'throughput_rows_s'):
+            label = f"batch={batch_size} {metric}"
+            print(f"{label:32} {fmt(old[metric] if old else None):>12} {fmt(new[metric]):>12}")
+
+
+# ============================================
+# Promoção
+# ============================================
+def has_artifact(artifact_dir: Path) -> bool:
+    """Verifica se o diretório contém um artefato completo"""
+    return all((artifact_dir / name).exists() for name in ARTIFACT_FILES)
+
+
+def promote_candidate(candidate_dir: Path = CANDIDATE_DIR, model_dir: Path = MODEL_DIR):
+    """
+    Move os arquivos do candidato para o diretório de modelos.
+
+    Os arquivos são primeiro copiados para nomes temporários ao lado dos
+    atuais (etapa lenta; uma falha aqui mantém o modelo atual intacto) e só
+    então trocados com os.replace, que é atômico por arquivo.
+    model_metadata.json é trocado por último.
+    """
+    names = [n for n in OPTIONAL_ARTIFACT_FILES if (candidate_dir / n).exists()]
+    names += [n for n in ARTIFACT_FILES if n != 'model_metadata.json']
+    names.append('model_metadata.json')
+
+    staged = []
+    try:
+        for name in names:
+            tmp_path = model_dir / f"{name}.promoting"
+            shutil.copy2(candidate_dir / name, tmp_path)
+            staged.append((tmp_path, model_dir / name))
+    except Exception:
+        for tmp_path, _ in staged:
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    for name in OPTIONAL_ARTIFACT_FILES:
+        if name not in names and (model_dir / name).exists():
+            # Não deixar um arquivo do modelo anterior junto ao novo
+            (model_dir / name).unlink()
+    for tmp_path, final_path in staged:
+        os.replace(tmp_path, final_path)
+
+    for name in names:
+        (candidate_dir / name).unlink()
+    try:
+        candidate_dir.rmdir()
+    except OSError:
+        pass  # Diretório não vazio ou já removido
+
+
+def gate_candidate(X: np.ndarray,
+                   candidate_dir: Path = CANDIDATE_DIR,
+                   model_dir: Path = MODEL_DIR,
+                   batch_sizes: List[int] = DEFAULT_BATCH_SIZES,
+                   repeats: int = DEFAULT_REPEATS,
+                   trials: int = DEFAULT_TRIALS,
+                   thresholds: Dict[str, float] = DEFAULT_THRESHOLDS,
+                   noise_floors: Dict[str, float] = DEFAULT_NOISE_FLOORS,
+                   force: bool = False) -> bool:
+    """
+    Compara candidato e atual e promove o candidato se não houver regressão.
+
+    Retorna True se o candidato foi promovido.
+    """
+    has_current = has_artifact(model_dir)
+    artifacts = {'candidato': candidate_dir}
+    if has_current:
+        artifacts['atual'] = model_dir
+
+    reports = {label: [] for label in artifacts}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sample_path = Path(tmp_dir) / 'benchmark_sample.npy'
+        np.save(sample_path, X)
+
+        # Alterna a ordem a cada rodada para distribuir o ruído entre os dois
+        for trial in range(trials):
+            print(f"⏱️  Rodada {trial + 1}/{trials}: medindo {' e '.join(artifacts)}...")
+            order = list(artifacts.items())
+            if trial % 2:
+                order.reverse()
+            loads = {label: measure_load(artifact_dir) for label, artifact_dir in order}
+            latencies = measure_latency(
+                [artifact_dir for _, artifact_dir in order], sample_path, batch_sizes, repeats
+            )
+            for (label, _), batches in zip(order, latencies):
+                reports[label].append(dict(loads[label], batches=batches))
+
+    candidate = median_report(reports['candidato'])
+
+    if not has_current:
+        print_report(None, candidate)
+        print("\nℹ️  Nenhum artefato atual encontrado, promovendo candidato")
+        promote_candidate(candidate_dir, model_dir)
+        return True
+
+    current = median_report(reports['atual'])
+    print_report(current, candidate)
+
+    spreads = [spread_report(r) for r in reports.values()]
+    regressions = compare_reports(current, candidate, thresholds, noise_floors, spreads)
+    if regressions:
+        print("\n❌ Regressões de performance detectadas:")
+        for regression in regressions:
+            print(f"   • {regression}")
+        if not force:
+            print("\n⚠️  Candidato NÃO promovido. Arquivos atuais mantidos.")
+            print(f"   Candidato disponível em: {candidate_dir}")
+            return False
+        print("\n⚠️  --force: promovendo candidato mesmo com regressões")
+    else:
+        print("\n✅ Nenhuma regressão detectada")
+
+    promote_candidate(candidate_dir, model_dir)
+    print(f"✓ Candidato promovido para: {model_dir}")
+    return True
+
+
+# ============================================
+# Main
+# ============================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Gate de regressão de performance do modelo")
+    parser.add_argument('--candidate', type=Path, default=CANDIDATE_DIR,
+                        help="Diretório do artefato candidato")
+    parser.add_argument('--current', type=Path, default=MODEL_DIR,
+                        help="Diretório do artefato atual")
+    parser.add_argument('--data', type=Path, default=DATA_DIR / 'spotify_songs.csv',
+                        help="CSV do dataset de treino")
+    parser.add_argument('--sample-size', type=int, default=DEFAULT_SAMPLE_SIZE)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--trials', type=int, default=DEFAULT_TRIALS,
+                        help="Rodadas alternadas candidato/atual (compara medianas)")
+    parser.add_argument('--noise-floor-ms', type=float, default=None,
+                        help="Ignora diferenças de latência abaixo deste valor (ms)")
+    parser.add_argument('--load-time-floor-s', type=float,
+                        default=DEFAULT_NOISE_FLOORS['load_time_s'],
+                        help="Ignora diferenças de tempo de carga abaixo deste valor (s)")
+    parser.add_argument('--rss-floor-mb', type=float,
+                        default=DEFAULT_NOISE_FLOORS['load_rss_mb'],
+                        help="Ignora diferenças de memória abaixo deste valor (MB)")
+    # Uso interno: medições em subprocesso, resultado impresso em JSON
+    parser.add_argument('--measure-load', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--measure-latency', type=Path, nargs='+', help=argparse.SUPPRESS)
+    parser.add_argument('--sample-file', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--force', action='store_true',
+                        help="Promove o candidato mesmo com regressões")
+    threshold_flags = {
+        'load_time_s': '--max-load-time-regression',
+        'load_rss_mb': '--max-rss-regression',
+        'p50_ms': '--max-p50-regression',
+        'p99_ms': '--max-p99-regression',
+        'throughput_rows_s': '--max-throughput-regression',
+    }
+    for metric, flag in threshold_flags.items():
+        default = DEFAULT_THRESHOLDS[metric]
+        parser.add_argument(flag, type=float, default=default, dest=f"threshold_{metric}",
+                            help=f"Regressão máxima de {metric} (padrão: {default:.0%}%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.measure_load:
+        print(json.dumps(_measure_load(str(args.measure_load))))
+        return 0
+    if args.measure_latency:
+        X = np.load(args.sample_file)
+        dirs = [str(d) for d in args.measure_latency]
+        print(json.dumps(_measure_latency(dirs, X, args.batch_sizes, args.repeats)))
+        return 0
+
+    thresholds = {metric: getattr(args, f"threshold_{metric}") for metric in DEFAULT_THRESHOLDS}
+    noise_floors = dict(DEFAULT_NOISE_FLOORS)
+    noise_floors['load_time_s'] = args.load_time_floor_s
+    noise_floors['load_rss_mb'] = args.rss_floor_mb
+    if args.noise_floor_ms is not None:
+        for metric in ('p50_ms', 'p99_ms', 'throughput_rows_s'):
+            noise_floors[metric] = args.noise_floor_ms
+
+    if not has_artifact(args.candidate):
+        print(f"❌ Artefato candidato não encontrado em: {args.candidate}")
+        return 1
+
+    print("📂 Carregando amostra de benchmark...")
+    X = load_benchmark_sample(args.data, read_feature_order(args.candidate), args.sample_size)
+    print(f"✓ {len(X)} linhas, batches: {args.batch_sizes}")
+
+    promoted = gate_candidate(
+        X,
+        candidate_dir=args.candidate,
+        model_dir=args.current,
+        batch_sizes=args.batch_sizes,
+        repeats=args.repeats,
+        trials=args.trials,
+        thresholds=thresholds,
+        noise_floors=noise_floors,
+        force=args.force,
+    )
+    return 0 if promoted else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
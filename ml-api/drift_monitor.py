@@ -0,0 +1,220 @@
+# ============================================
+# Monitor de Drift das Features
+# ============================================
+"""
+Compara continuamente as entradas recebidas pela API com a distribuição
+de treino salva em metadata['features']['stats'].
+
+Cada feature tem um histograma de tamanho fixo (bordas definidas no
+treino). As requisições só enfileiram o registro (O(1)); uma thread de
+fundo atualiza os histogramas. A janela deslizante é um anel de
+N_SLOTS intervalos de SLOT_SECONDS, então a memória é constante
+(intervalos × features × bins), independente do volume de tráfego.
+
+Divergências calculadas por feature, contra a referência de treino:
+    - PSI (Population Stability Index): > 0.1 moderado, > 0.2 relevante
+    - Jensen-Shannon (base 2, entre 0 e 1)
+
+Features sem histograma no metadata (modelos exportados antes do monitor)
+não têm referência: aparecem com psi/js_divergence nulos e nunca são
+marcadas como drift. Abaixo de MIN_SAMPLES amostras na janela, as
+divergências são reportadas mas drifted_features fica nulo.
+"""
+
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+N_BINS = 20
+N_SLOTS = 12
+SLOT_SECONDS = 300  # Janela padrão: 12 × 5 min = 1 hora
+QUEUE_SIZE = 10000
+PSI_DRIFT_THRESHOLD = 0.2
+# Mínimo de amostras na janela para apontar features com drift
+MIN_SAMPLES = 100
+# Suavização para bins vazios
+EPSILON = 1e-4
+
+
+def build_reference_histogram(values: np.ndarray, n_bins: int = N_BINS) -> Dict:
+    """
+    Histograma de referência de uma feature no treino.
+
+    Bordas por quantis (bins com massa parecida mesmo em features
+    assimétricas); bordas repetidas são unidas. Features discretas com
+    poucos valores (key, mode, ...) ganham um bin por valor.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    unique = np.unique(values)
+    if len(unique) <= n_bins:
+        midpoints = (unique[:-1] + unique[1:]) / 2
+        edges = np.concatenate([unique[:1], midpoints, unique[-1:]])
+    else:
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)))
+    if len(edges) < 2:
+        edges = np.array([edges[0], edges[0]])
+
+    counts = np.bincount(_bin_index(edges, values), minlength=len(edges) - 1)
+    return {
+        'edges': edges.tolist(),
+        'fractions': (counts / max(counts.sum(), 1)).tolist(),
+    }
+
+
+def _bin_index(edges: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Índice do bin de cada valor (primeiro/último bins são abertos)"""
+    return np.searchsorted(edges[1:-1], values, side='right')
+
+
+class DriftMonitor:
+    """Histogramas por feature em janela deslizante, atualizados fora da resposta"""
+
+    def __init__(self, features_metadata: Dict, n_slots: int = N_SLOTS,
+                 slot_seconds: float = SLOT_SECONDS, queue_size: int = QUEUE_SIZE):
+        self.feature_order: List[str] = list(features_metadata['list'])
+        self.n_slots = n_slots
+        self.slot_seconds = slot_seconds
+
+        # Sem histograma no metadata = sem referência (a feature não é monitorada)
+        stats = features_metadata['stats']
+        references = [stats[f].get('histogram') for f in self.feature_order]
+        self._edges: List[Optional[np.ndarray]] = [
+            np.asarray(r['edges'], dtype=float) if r else None for r in references
+        ]
+        self._reference: List[Optional[np.ndarray]] = [
+            np.asarray(r['fractions'], dtype=float) if r else None for r in references
+        ]
+
+        # Todas as features compartilham uma matriz (padding até o maior nº de bins)
+        self._n_bins = np.array([len(r) if r is not None else 1 for r in self._reference])
+        self._counts = np.zeros((n_slots, len(self.feature_order), self._n_bins.max()), dtype=np.int64)
+        self._samples = np.zeros(n_slots, dtype=np.int64)
+        self._slot_ids = np.full(n_slots, -1, dtype=np.int64)
+
+        self._lock = threading.Lock()
+        self._dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._worker = threading.Thread(target=self._run, name='drift-monitor', daemon=True)
+        self._worker.start()
+
+    # ============================================
+    # Caminho da requisição
+    # ============================================
+    def record(self, record: Dict):
+        """Enfileira um registro de features (não bloqueia; descarta se a fila estiver cheia)"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+
+    # ============================================
+    # Thread de fundo
+    # ============================================
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+
+            # Drenar o que já estiver na fila e atualizar em lote
+            records = [record]
+            stop = False
+            while len(records) < 1000:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                records.append(record)
+
+            self._update(records)
+            if stop:
+                return
+
+    def _update(self, records: List[Dict]):
+        X = np.array(
+            [[r.get(f, 0) for f in self.feature_order] for r in records], dtype=float
+        )
+        X = X[np.isfinite(X).all(axis=1)]
+
+        slot_id = int(time.time() // self.slot_seconds)
+        idx = slot_id % self.n_slots
+        with self._lock:
+            if self._slot_ids[idx] != slot_id:
+                # Intervalo antigo saiu da janela
+                self._counts[idx] = 0
+                self._samples[idx] = 0
+                self._slot_ids[idx] = slot_id
+            self._samples[idx] += len(X)
+            for f_idx, edges in enumerate(self._edges):
+                if edges is None:
+                    continue
+                np.add.at(self._counts[idx, f_idx], _bin_index(edges, X[:, f_idx]), 1)
+
+    def close(self):
+        """Encerra a thread de fundo"""
+        self._queue.put(None)
+        self._worker.join()
+
+    # ============================================
+    # Métricas
+    # ============================================
+    def window_counts(self) -> np.ndarray:
+        """Contagens somadas dos intervalos dentro da janela (features × bins)"""
+        return self._window()[0]
+
+    def _window(self):
+        current = int(time.time() // self.slot_seconds)
+        with self._lock:
+            valid = (self._slot_ids > current - self.n_slots) & (self._slot_ids >= 0)
+            return self._counts[valid].sum(axis=0), int(self._samples[valid].sum()), self._dropped
+
+    def report(self, psi_threshold: float = PSI_DRIFT_THRESHOLD,
+               min_samples: int = MIN_SAMPLES) -> Dict:
+        """Divergências por feature na janela atual"""
+        counts, n_samples, dropped = self._window()
+
+        features = {}
+        for f_idx, feature in enumerate(self.feature_order):
+            has_reference = self._reference[f_idx] is not None
+            if n_samples == 0 or not has_reference:
+                features[feature] = {'psi': None, 'js_divergence': None, 'reference': has_reference}
+                continue
+
+            q = self._reference[f_idx] + EPSILON
+            q = q / q.sum()
+            p = counts[f_idx, :self._n_bins[f_idx]] + EPSILON * n_samples
+            p = p / p.sum()
+
+            m = (p + q) / 2
+            js = 0.5 * np.sum(p * np.log2(p / m)) + 0.5 * np.sum(q * np.log2(q / m))
+            features[feature] = {
+                'psi': float(np.sum((p - q) * np.log(p / q))),
+                'js_divergence': float(js),
+                'reference': True,
+            }
+
+        psi_values = {f: s['psi'] for f, s in features.items() if s['psi'] is not None}
+        enough_samples = n_samples >= min_samples
+        return {
+            'window_seconds': self.n_slots * self.slot_seconds,
+            'n_samples': n_samples,
+            'min_samples': min_samples,
+            'enough_samples': enough_samples,
+            'dropped': dropped,
+            'max_psi': max(psi_values.values()) if psi_values else None,
+            'psi_threshold': psi_threshold,
+            # Poucas amostras: PSI alto por acaso, não apontar drift
+            'drifted_features': (
+                [f for f, psi in psi_values.items() if psi > psi_threshold]
+                if enough_samples else None
+            ),
+            'features': features,
+        }
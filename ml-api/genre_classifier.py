@@ -0,0 +1,351 @@
+# ============================================
+# Classificador de Gênero Musical (uso em processo)
+# ============================================
+"""
+Biblioteca para carregar o modelo exportado e fazer predições no mesmo
+processo, sem passar pela API HTTP. O servidor FastAPI
+(api_model_server.py) é apenas uma camada fina sobre esta classe.
+
+Uso:
+    from genre_classifier import GenreClassifier
+
+    with GenreClassifier() as classifier:
+        results = classifier.classify([{'danceability': 0.65, 'energy': 0.70, ...}])
+        proba = classifier.predict_proba(X)  # X na ordem de classifier.feature_order
+
+Thread safety: o modelo carregado fica em um snapshot imutável, trocado
+atomicamente por load(); chamadas concorrentes sempre usam um snapshot
+consistente. Com max_batch_size > 1, chamadas concorrentes a
+predict_proba são agrupadas em um único lote por uma thread de trabalho.
+
+Quem mantém estado derivado do modelo (ex.: o servidor) registra uma
+callback com add_load_listener(); ela é chamada a cada load()/recarga.
+"""
+
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import joblib
+import numpy as np
+
+from input_validation import build_validation_bounds, validate_batch
+from tree_contributions import compute_contributions
+
+BASE_DIR = Path(__file__).resolve().parent
+MODEL_DIR = BASE_DIR / 'saved_models'
+
+
+class ExplanationUnavailable(Exception):
+    """O modelo carregado não suporta explicações (não é baseado em árvores)"""
+
+
+class GenreClassifier:
+    """Classificador de gênero musical carregado em processo"""
+
+    def __init__(self, model_dir: Path = MODEL_DIR,
+                 max_batch_size: int = 0, max_wait_ms: float = 2.0):
+        self.model_dir = Path(model_dir)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._lock = threading.Lock()
+        self._state: Optional[Dict] = None
+        self._queue: Optional[queue.Queue] = None
+        self._worker: Optional[threading.Thread] = None
+        self._load_listeners: List[Callable[['GenreClassifier'], None]] = []
+
+    # ============================================
+    # Ciclo de vida
+    # ============================================
+    def load(self) -> 'GenreClassifier':
+        """Carrega (ou recarrega) o modelo e seus componentes"""
+        pipeline = joblib.load(self.model_dir / 'genre_classifier_pipeline.joblib')
+        genre_encoder = joblib.load(self.model_dir / 'genre_encoder.joblib')
+        with open(self.model_dir / 'model_metadata.json', 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        # Contribuições por nó (opcional, apenas modelos de árvores)
+        contributions_path = self.model_dir / 'tree_contributions.joblib'
+        contributions_table = joblib.load(contributions_path) if contributions_path.exists() else None
+
+        feature_order = metadata['features']['list']
+        state = {
+            'pipeline': pipeline,
+            'genres': list(genre_encoder.classes_),
+            'metadata': metadata,
+            'feature_order': feature_order,
+            'validation_bounds': build_validation_bounds(metadata['features']['stats'], feature_order),
+            'contributions_table': contributions_table,
+        }
+
+        with self._lock:
+            self._state = state
+            if self.max_batch_size > 1 and self._worker is None:
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(
+                    target=self._batch_worker, name='genre-classifier-batcher', daemon=True
+                )
+                self._worker.start()
+
+        for listener in list(self._load_listeners):
+            listener(self)
+        return self
+
+    def add_load_listener(self, listener: Callable[['GenreClassifier'], None]):
+        """
+        Registra uma callback chamada após cada load() (inclusive recargas).
+
+        Se o modelo já estiver carregado, a callback é chamada imediatamente.
+        """
+        self._load_listeners.append(listener)
+        if self._state is not None:
+            listener(self)
+
+    def close(self):
+        """Encerra a thread de lotes e libera o modelo"""
+        with self._lock:
+            worker, self._worker = self._worker, None
+            if worker is not None:
+                self._queue.put(None)
+            self._state = None
+        if worker is not None:
+            worker.join()
+
+    def __enter__(self) -> 'GenreClassifier':
+        if self._state is None:
+            self.load()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ============================================
+    # Propriedades
+    # ============================================
+    def _current_state(self) -> Dict:
+        state = self._state
+        if state is None:
+            raise RuntimeError("Modelo não carregado, chame load() primeiro")
+        return state
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._state is not None
+
+    @property
+    def metadata(self) -> Dict:
+        return self._current_state()['metadata']
+
+    @property
+    def feature_order(self) -> List[str]:
+        return self._current_state()['feature_order']
+
+    @property
+    def genres(self) -> List[str]:
+        return self._current_state()['genres']
+
+    @property
+    def can_explain(self) -> bool:
+        return self._current_state()['contributions_table'] is not None
+
+    # ============================================
+    # Predição
+    # ============================================
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilidades de cada gênero (colunas na ordem de self.genres)"""
+        return self._predict_proba(self._current_state(), X)
+
+    def _predict_proba(self, state: Dict, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.shape[1] != len(state['feature_order']):
+            raise ValueError(
+                f"Esperado array (n, {len(state['feature_order'])}), recebido {X.shape}"
+            )
+
+        # Verificar e enfileirar sob o lock: close() não pode colocar o
+        # sentinela entre os dois passos e deixar a chamada presa
+        future = None
+        with self._lock:
+            if self._worker is not None:
+                future = Future()
+                self._queue.put((state, X, future))
+        if future is None:
+            return state['pipeline'].predict_proba(X)
+        return future.result()
+
+    def _batch_worker(self):
+        """Agrupa chamadas concorrentes de predict_proba em um único lote"""
+        pending = None
+        while True:
+            item = pending if pending is not None else self._queue.get()
+            pending = None
+            if item is None:
+                return
+
+            batch = [item]
+            rows = len(item[1])
+            stop = False
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while rows < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    next_item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if next_item is None:
+                    stop = True
+                    break
+                # Não misturar snapshots de modelos diferentes no mesmo lote
+                if next_item[0] is not item[0]:
+                    pending = next_item
+                    break
+                batch.append(next_item)
+                rows += len(next_item[1])
+
+            self._run_batch(batch)
+            if stop:
+                return
+
+    @staticmethod
+    def _run_batch(batch: List):
+        state = batch[0][0]
+        try:
+            proba = state['pipeline'].predict_proba(np.vstack([X for _, X, _ in batch]))
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        start = 0
+        for _, X, future in batch:
+            future.set_result(proba[start:start + len(X)])
+            start += len(X)
+
+    # ============================================
+    # Registros (dicts de features)
+    # ============================================
+    @staticmethod
+    def _to_matrix(state: Dict, records: List[Dict]) -> np.ndarray:
+        """Converte registros em matriz na ordem das features (ausentes = 0)"""
+        return np.array(
+            [[record.get(f, 0) for f in state['feature_order']] for record in records],
+            dtype=float
+        ).reshape(len(records), len(state['feature_order']))
+
+    @staticmethod
+    def _validate(state: Dict, X: np.ndarray) -> List[Dict]:
+        """Relatórios de validação por linha; rejeita valores não finitos"""
+        result = validate_batch(state['validation_bounds'], X)
+
+        if result['non_finite'].any():
+            rows = np.flatnonzero(result['non_finite']).tolist()
+            raise ValueError(f"Valores não finitos nas linhas: {rows}")
+
+        feature_order = state['feature_order']
+        return [
+            {
+                'out_of_distribution': bool(result['out_of_distribution'][row]),
+                'max_abs_zscore': float(result['max_abs_zscore'][row]),
+                'out_of_range_features': [
+                    feature_order[idx] for idx in np.flatnonzero(result['out_of_range'][row])
+                ],
+            }
+            for row in range(len(X))
+        ]
+
+    def classify(self, records: List[Dict]) -> List[Dict]:
+        """
+        Classifica uma lista de registros (músicas ou perfis).
+
+        Retorna, para cada registro, o gênero previsto, a confiança, os
+        scores de todos os gêneros e o relatório de validação.
+        """
+        state = self._current_state()
+        if not records:
+            return []
+
+        X = self._to_matrix(state, records)
+        validations = self._validate(state, X)
+        proba = self._predict_proba(state, X)
+
+        results = []
+        for row, validation in enumerate(validations):
+            all_scores = [
+                {
+                    'genre': genre,
+                    'probability': float(proba[row, idx]),
+                    'confidence': float(proba[row, idx]) * 100,
+                }
+                for idx, genre in enumerate(state['genres'])
+            ]
+            # Ordenar por probabilidade
+            all_scores.sort(key=lambda x: x['probability'], reverse=True)
+
+            results.append({
+                'primary_genre': all_scores[0]['genre'],
+                'confidence': all_scores[0]['probability'],
+                'all_scores': all_scores,
+                'validation': validation,
+            })
+        return results
+
+    def explain(self, records: List[Dict]) -> List[Dict]:
+        """
+        Contribuições de cada feature para a probabilidade de cada gênero.
+
+        probabilidade = base_value + soma das contribuições. Disponível
+        apenas para modelos de árvores (ExplanationUnavailable caso contrário).
+        """
+        state = self._current_state()
+        if state['contributions_table'] is None:
+            raise ExplanationUnavailable(
+                f"Explicações indisponíveis para o modelo {state['metadata']['model_info']['type']}"
+            )
+        if not records:
+            return []
+
+        X = self._to_matrix(state, records)
+        validations = self._validate(state, X)
+
+        # As árvores operam sobre as features normalizadas
+        pipeline = state['pipeline']
+        X_scaled = pipeline.named_steps['scaler'].transform(X)
+        bias, contributions = compute_contributions(
+            pipeline.named_steps['model'], state['contributions_table'], X_scaled
+        )
+        probabilities = bias + contributions.sum(axis=1)
+
+        feature_order = state['feature_order']
+        explanations = []
+        for row, validation in enumerate(validations):
+            genres = []
+            for idx, genre in enumerate(state['genres']):
+                feature_contributions = {
+                    feature: float(contributions[row, f_idx, idx])
+                    for f_idx, feature in enumerate(feature_order)
+                }
+                genres.append({
+                    'genre': genre,
+                    'probability': float(probabilities[row, idx]),
+                    'base_value': float(bias[idx]),
+                    # Maiores contribuições (em módulo) primeiro
+                    'contributions': dict(sorted(
+                        feature_contributions.items(), key=lambda x: abs(x[1]), reverse=True
+                    )),
+                })
+
+            # Ordenar por probabilidade
+            genres.sort(key=lambda x: x['probability'], reverse=True)
+            explanations.append({
+                'primary_genre': genres[0]['genre'],
+                'genres': genres,
+                'validation': validation,
+            })
+        return explanations
@@ -0,0 +1,59 @@
+# ============================================
+# Validação Vetorizada de Entradas
+# ============================================
+"""
+Validação de lotes de features contra a distribuição de treino
+salva em metadata['features']['stats'].
+
+Para cada linha do lote calcula, de uma só vez com numpy:
+    - valores não finitos (NaN/inf), que invalidam a linha
+    - features fora do intervalo [min, max] visto no treino
+    - z-score de cada feature e a flag de fora da distribuição (OOD)
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+# |z-score| acima do qual uma linha é considerada fora da distribuição
+OOD_ZSCORE_THRESHOLD = 4.0
+
+
+def build_validation_bounds(stats: Dict, feature_order: List[str]) -> Dict:
+    """Converte as estatísticas do metadata em arrays na ordem das features"""
+    std = np.array([stats[f]['std'] for f in feature_order], dtype=float)
+    return {
+        'features': list(feature_order),
+        'min': np.array([stats[f]['min'] for f in feature_order], dtype=float),
+        'max': np.array([stats[f]['max'] for f in feature_order], dtype=float),
+        'mean': np.array([stats[f]['mean'] for f in feature_order], dtype=float),
+        # Features constantes no treino não contribuem para o z-score
+        # (valores diferentes já são pegos pela checagem de intervalo)
+        'std': np.where(std > 0, std, np.inf),
+    }
+
+
+def validate_batch(bounds: Dict, X: np.ndarray,
+                   zscore_threshold: float = OOD_ZSCORE_THRESHOLD) -> Dict:
+    """
+    Valida um lote (n_amostras × n_features).
+
+    Retorna um dict de arrays por linha:
+        non_finite:         bool (n,)    - linha contém NaN/inf
+        out_of_range:       bool (n, f)  - feature fora de [min, max]
+        max_abs_zscore:     float (n,)   - maior |z-score| da linha
+        out_of_distribution: bool (n,)   - |z| acima do limite ou fora do intervalo
+    """
+    X = np.asarray(X, dtype=float)
+    non_finite = ~np.isfinite(X).all(axis=1)
+
+    out_of_range = (X < bounds['min']) | (X > bounds['max'])
+    abs_z = np.abs((X - bounds['mean']) / bounds['std'])
+    max_abs_zscore = np.nan_to_num(abs_z.max(axis=1), nan=np.inf)
+
+    return {
+        'non_finite': non_finite,
+        'out_of_range': out_of_range,
+        'max_abs_zscore': max_abs_zscore,
+        'out_of_distribution': (max_abs_zscore > zscore_threshold) | out_of_range.any(axis=1),
+    }
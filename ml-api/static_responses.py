@@ -0,0 +1,80 @@
+# ============================================
+# Respostas Estáticas Pré-computadas
+# ============================================
+"""
+Respostas pré-serializadas para endpoints que só dependem do metadata
+do modelo (/, /info, /genres).
+
+O corpo JSON e sua variante gzip são gerados uma única vez a cada carga
+do modelo (o servidor registra a reconstrução em
+GenreClassifier.add_load_listener). Cada variante tem um ETag forte derivado do conteúdo, então
+um novo metadata gera automaticamente novos ETags.
+"""
+
+import gzip
+import hashlib
+import json
+from typing import Dict
+
+from fastapi import Request, Response
+
+CACHE_CONTROL = "public, max-age=60"
+
+
+def build_static_response(payload: Dict) -> Dict:
+    """Serializa o payload e pré-computa a variante gzip e os ETags"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return {
+        'body': body,
+        # mtime=0 mantém o gzip determinístico entre reinícios
+        'gzip_body': gzip.compress(body, compresslevel=9, mtime=0),
+        'etag': f'"{digest}"',
+        'gzip_etag': f'"{digest}-gzip"',
+    }
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Verifica se o cliente aceita gzip (respeitando q=0 e '*')"""
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.strip().partition(';')
+        q = 1.0
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[name.strip().lower()] = q
+
+    # Uma entrada explícita para gzip tem precedência sobre '*'
+    if 'gzip' in qualities:
+        return qualities['gzip'] > 0
+    return qualities.get('*', 0) > 0
+
+
+def _etag_matches(if_none_match: str, entry: Dict) -> bool:
+    """Compara If-None-Match com os ETags das duas variantes"""
+    if if_none_match.strip() == '*':
+        return True
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return entry['etag'] in tags or entry['gzip_etag'] in tags
+
+
+def serve_static_response(entry: Dict, request: Request) -> Response:
+    """Responde com a variante adequada, ou 304 se o cliente já a possui"""
+    use_gzip = _accepts_gzip(request.headers.get('accept-encoding', ''))
+    headers = {
+        'ETag': entry['gzip_etag'] if use_gzip else entry['etag'],
+        'Cache-Control': CACHE_CONTROL,
+        'Vary': 'Accept-Encoding',
+    }
+
+    if _etag_matches(request.headers.get('if-none-match', ''), entry):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+        return Response(content=entry['gzip_body'], media_type='application/json', headers=headers)
+    return Response(content=entry['body'], media_type='application/json', headers=headers)
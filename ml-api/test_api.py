@@ -8,6 +8,7 @@ Testa os endpoints da API de classificação de gênero musical.
 import requests
 import json
 import sys
+import time
 from typing import Dict, Any
 
 API_BASE_URL = "http://localhost:8000"
@@ -159,6 +160,165 @@ def test_different_profiles():
     
     return all(results)
 
+def test_validation():
+    """Testa o relatório de validação (entradas fora da distribuição de treino)"""
+    print("🔍 Testando validação das entradas...")
+    
+    typical = {
+        "danceability": 0.65, "energy": 0.70, "valence": 0.60,
+        "tempo": 120.0, "acousticness": 0.25, "instrumentalness": 0.05,
+        "speechiness": 0.08, "loudness": -5.0
+    }
+    # Tempo e volume muito além do visto no treino
+    extreme = dict(typical, tempo=2000.0, loudness=-200.0)
+    
+    try:
+        results = []
+        for label, features in (("típico", typical), ("extremo", extreme)):
+            response = requests.post(f"{API_BASE_URL}/classify_profile", json=features, timeout=10)
+            if response.status_code != 200:
+                print(f"❌ Erro ({label}): Status {response.status_code}")
+                return False
+            validation = response.json().get('validation')
+            if validation is None:
+                print(f"❌ Resposta ({label}) sem o campo 'validation'")
+                return False
+            print(f"   • {label:8} → OOD: {validation['out_of_distribution']}, "
+                  f"|z| máx: {validation['max_abs_zscore']:.1f}, "
+                  f"fora do intervalo: {validation['out_of_range_features']}")
+            results.append(validation)
+        
+        if not results[1]['out_of_distribution'] or 'tempo' not in results[1]['out_of_range_features']:
+            print("❌ Perfil extremo não foi sinalizado")
+            return False
+        print("✅ Perfil extremo sinalizado como fora da distribuição")
+        return True
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro: {e}")
+        return False
+
+def test_explain():
+    """Testa o endpoint de explicações (base + contribuições = probabilidade)"""
+    print("🔍 Testando explicações por predição...")
+    
+    test_profile = {
+        "danceability": 0.65, "energy": 0.70, "valence": 0.60,
+        "tempo": 120.0, "acousticness": 0.25, "instrumentalness": 0.05,
+        "speechiness": 0.08, "loudness": -5.0
+    }
+    
+    try:
+        response = requests.post(
+            f"{API_BASE_URL}/explain",
+            json={"profiles": [test_profile]},
+            timeout=10
+        )
+        
+        # Modelos que não são de árvores não têm explicações
+        if response.status_code == 501:
+            print(f"⚠️  Explicações indisponíveis para este modelo (501): {response.json()['detail']}")
+            return True
+        if response.status_code != 200:
+            print(f"❌ Erro: Status {response.status_code}")
+            print(f"   Resposta: {response.text}")
+            return False
+        
+        explanation = response.json()['explanations'][0]
+        classified = requests.post(f"{API_BASE_URL}/classify_profile", json=test_profile, timeout=10).json()
+        expected = {score['genre']: score['probability'] for score in classified['all_scores']}
+        
+        ok = True
+        for genre in explanation['genres']:
+            total = genre['base_value'] + sum(genre['contributions'].values())
+            if abs(total - genre['probability']) > 1e-6 or abs(total - expected[genre['genre']]) > 1e-6:
+                print(f"❌ {genre['genre']}: base + contribuições = {total:.6f}, "
+                      f"probabilidade = {expected[genre['genre']]:.6f}")
+                ok = False
+        
+        top = explanation['genres'][0]
+        print(f"✅ Gênero previsto: {explanation['primary_genre'].upper()} ({top['probability']:.2%})")
+        print(f"✅ Base: {top['base_value']:.3f}")
+        for feature, value in list(top['contributions'].items())[:3]:
+            print(f"   • {feature}: {value:+.3f}")
+        if ok:
+            print("✅ Base + contribuições = probabilidade para todos os gêneros")
+        return ok
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro: {e}")
+        return False
+
+def test_static_cache():
+    """Testa ETag, 304 e gzip nos endpoints estáticos"""
+    print("🔍 Testando cache das respostas estáticas...")
+    
+    results = []
+    for endpoint in ("/info", "/genres"):
+        try:
+            plain = requests.get(f"{API_BASE_URL}{endpoint}",
+                                 headers={"Accept-Encoding": "identity"}, timeout=5)
+            gzipped = requests.get(f"{API_BASE_URL}{endpoint}",
+                                   headers={"Accept-Encoding": "gzip"}, timeout=5)
+            etag = gzipped.headers.get('ETag')
+            cached = requests.get(f"{API_BASE_URL}{endpoint}",
+                                  headers={"Accept-Encoding": "gzip", "If-None-Match": etag or ""},
+                                  timeout=5)
+            
+            checks = {
+                "200 sem gzip": plain.status_code == 200 and 'Content-Encoding' not in plain.headers,
+                "200 com gzip": gzipped.status_code == 200 and gzipped.headers.get('Content-Encoding') == 'gzip',
+                "mesmo conteúdo": plain.json() == gzipped.json(),
+                "ETag por variante": bool(etag) and etag != plain.headers.get('ETag'),
+                "304 com If-None-Match": cached.status_code == 304 and not cached.content,
+            }
+            for check, passed in checks.items():
+                print(f"   {'✅' if passed else '❌'} {endpoint:8} {check}")
+            results.append(all(checks.values()))
+        except requests.exceptions.RequestException as e:
+            print(f"❌ {endpoint} → Erro: {e}")
+            results.append(False)
+    
+    return all(results)
+
+def test_drift():
+    """Testa o endpoint de drift das entradas"""
+    print("🔍 Testando monitor de drift...")
+    try:
+        before = requests.get(f"{API_BASE_URL}/metrics/drift", timeout=5).json()
+        
+        requests.post(
+            f"{API_BASE_URL}/classify_profile",
+            json={
+                "danceability": 0.65, "energy": 0.70, "valence": 0.60,
+                "tempo": 120.0, "acousticness": 0.25, "instrumentalness": 0.05,
+                "speechiness": 0.08, "loudness": -5.0
+            },
+            timeout=10
+        )
+        # Os histogramas são atualizados em segundo plano
+        time.sleep(0.5)
+        
+        response = requests.get(f"{API_BASE_URL}/metrics/drift", timeout=5)
+        if response.status_code != 200:
+            print(f"❌ Erro: Status {response.status_code}")
+            return False
+        data = response.json()
+        
+        print(f"✅ Janela: {data['window_seconds']}s, amostras: {data['n_samples']} "
+              f"(mínimo {data['min_samples']})")
+        print(f"✅ PSI máximo: {data['max_psi']}")
+        print(f"✅ Features com drift: {data['drifted_features']}")
+        
+        if data['n_samples'] <= before['n_samples']:
+            print("❌ Classificação não foi registrada no monitor")
+            return False
+        if not data['enough_samples'] and data['drifted_features'] is not None:
+            print("❌ Drift apontado com amostras insuficientes")
+            return False
+        return set(data['features']) == set(before['features'])
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro: {e}")
+        return False
+
 def main():
     """Executa todos os testes"""
     print_section("TESTE DA API DE CLASSIFICAÇÃO MUSICAL")
@@ -172,6 +332,10 @@ def main():
         ("Informações do Modelo", test_info),
         ("Classificação de Perfil", test_classify_profile),
         ("Diferentes Perfis", test_different_profiles),
+        ("Validação das Entradas", test_validation),
+        ("Explicações", test_explain),
+        ("Cache de Respostas Estáticas", test_static_cache),
+        ("Monitor de Drift", test_drift),
     ]
     
     results = []
@@ -11,6 +11,7 @@ import pandas as pd
 import numpy as np
 import joblib
 import json
+import sys
 from pathlib import Path
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, LabelEncoder
@@ -19,6 +20,9 @@ from sklearn.neighbors import KNeighborsClassifier
 from sklearn.linear_model import LogisticRegression
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline
+from benchmark_model import CANDIDATE_DIR, gate_candidate, sample_rows
+from tree_contributions import build_contribution_table, compute_contributions
+from drift_monitor import build_reference_histogram
 
 # ============================================
 # 1. Configuração de Paths
@@ -28,6 +32,9 @@ BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR.parent.parent / 'PISI3-Projeto' / 'DataSet'
 MODEL_DIR = BASE_DIR / 'saved_models'
 MODEL_DIR.mkdir(exist_ok=True)
+# Artefatos novos são exportados como candidatos e só substituem os
+# atuais depois de passar pelo benchmark de performance (benchmark_model.py)
+CANDIDATE_DIR.mkdir(exist_ok=True)
 
 # ============================================
 # 2. Carregar o dataset
@@ -74,7 +81,9 @@ for feature in features:
         'mean': float(df[feature].mean()),
         'std': float(df[feature].std()),
         'min': float(df[feature].min()),
-        'max': float(df[feature].max())
+        'max': float(df[feature].max()),
+        # Referência para o monitor de drift (drift_monitor.py)
+        'histogram': build_reference_histogram(df[feature].to_numpy())
     }
 
 # ============================================
@@ -183,23 +192,40 @@ except Exception as e:
 # ============================================
 # 11. Salvar modelo e componentes
 # ============================================
-print("\n💾 Salvando modelo e componentes...")
+print("\n💾 Salvando modelo e componentes (candidato)...")
 
 # Salvar pipeline completo
-model_path = MODEL_DIR / 'genre_classifier_pipeline.joblib'
+model_path = CANDIDATE_DIR / 'genre_classifier_pipeline.joblib'
 joblib.dump(best_pipeline, model_path)
 print(f"✓ Pipeline salvo: {model_path}")
 
 # Salvar encoder de gêneros
-encoder_path = MODEL_DIR / 'genre_encoder.joblib'
+encoder_path = CANDIDATE_DIR / 'genre_encoder.joblib'
 joblib.dump(genre_encoder, encoder_path)
 print(f"✓ Encoder salvo: {encoder_path}")
 
 # Salvar encoder de subgêneros
-subgenre_encoder_path = MODEL_DIR / 'subgenre_encoder.joblib'
+subgenre_encoder_path = CANDIDATE_DIR / 'subgenre_encoder.joblib'
 joblib.dump(subgenre_encoder, subgenre_encoder_path)
 print(f"✓ Subgenre encoder salvo: {subgenre_encoder_path}")
 
+# Salvar contribuições por nó (explicações por predição em /explain)
+contributions_table = build_contribution_table(best_pipeline.named_steps['model'], len(features))
+contributions_path = CANDIDATE_DIR / 'tree_contributions.joblib'
+joblib.dump(contributions_table, contributions_path)
+if contributions_table is not None:
+    # Conferir a decomposição: base + soma das contribuições == predict_proba
+    X_check = X_test[:200]
+    bias, contributions = compute_contributions(
+        best_pipeline.named_steps['model'], contributions_table,
+        best_pipeline.named_steps['scaler'].transform(X_check)
+    )
+    if not np.allclose(bias + contributions.sum(axis=1), best_pipeline.predict_proba(X_check), atol=1e-6):
+        raise RuntimeError("Contribuições por nó não reproduzem predict_proba, abortando exportação")
+    print(f"✓ Contribuições por nó salvas e verificadas: {contributions_path}")
+else:
+    print(f"⚠️  {best_model_name} não é baseado em árvores, /explain indisponível")
+
 # Salvar metadados em JSON
 metadata = {
     'model_info': {
@@ -227,13 +253,22 @@ metadata = {
     }
 }
 
-metadata_path = MODEL_DIR / 'model_metadata.json'
+metadata_path = CANDIDATE_DIR / 'model_metadata.json'
 with open(metadata_path, 'w', encoding='utf-8') as f:
     json.dump(metadata, f, indent=2, ensure_ascii=False)
 print(f"✓ Metadata salvo: {metadata_path}")
 
 # ============================================
-# 12. Sumário Final
+# 12. Gate de performance e promoção
+# ============================================
+print("\n⏱️  Comparando performance com o modelo atual...")
+if not gate_candidate(sample_rows(X)):
+    print("\n❌ Modelo novo não promovido (regressão de performance)")
+    print("   Para promover mesmo assim: python benchmark_model.py --force")
+    sys.exit(1)
+
+# ============================================
+# 13. Sumário Final
 # ============================================
 print("\n" + "="*50)
 print("✅ MODELO TREINADO E EXPORTADO COM SUCESSO!")
@@ -242,6 +277,7 @@ print(f"\n📦 Arquivos salvos em: {MODEL_DIR}")
 print(f"   • {model_path.name}")
 print(f"   • {encoder_path.name}")
 print(f"   • {subgenre_encoder_path.name}")
+print(f"   • {contributions_path.name}")
 print(f"   • {metadata_path.name}")
 print(f"\n🎯 Modelo: {best_model_name}")
 print(f"🎵 Gêneros: {', '.join(genre_encoder.classes_)}")